@@ -1,8 +1,20 @@
 import asyncio
 import itertools
 import discord
+import logging
 
 from .controller import GameCubeController, ACTIONS
+from .scheduler import DeficitRoundRobin
+
+LOG = logging.getLogger("red.controller")
+
+# Seconds between consecutive button pushes
+FRAME_GAP = 1/8
+# Seconds of device time a member is given per turn at weight 1, enough for
+# the longest push
+QUANTUM = max(act.seconds for act in ACTIONS.values()) + FRAME_GAP
+# Most members looked at when merging pending inputs into one press
+COALESCE_SCAN = 8
 
 
 class ChannelController(GameCubeController):
@@ -12,15 +24,32 @@ class ChannelController(GameCubeController):
         self.paused = False
         self.channel = channel
         self.members = set()
-        self.members_who_pushed = set()
+        self.scheduler = DeficitRoundRobin(QUANTUM)
+        # Seconds to wait for other members' inputs to press alongside
+        self.coalesce_window = 0.05
+        self._scheduler_task = None
 
     async def ready_message(self):
         await self.channel.send(f"{self.ui.name}: READY")
 
-    async def close(self):
-        super().close()
+    async def closed_message(self):
         await self.channel.send(f"{self.ui.name}: CLOSED")
 
+    async def close(self, notify:bool=True):
+        self.reset()
+        super().close()
+        if notify:
+            await self.closed_message()
+
+    def reset(self):
+        """Drop all queued inputs and release any held buttons"""
+        if self._scheduler_task is not None:
+            self._scheduler_task.cancel()
+            # Let the next input start a fresh task straight away
+            self._scheduler_task = None
+        self.scheduler.clear()
+        self.release_all()
+
     def channel_and_member_check(self, channel:discord.TextChannel,
             member: discord.Member):
         if self.channel.id != channel.id:
@@ -28,28 +57,34 @@ class ChannelController(GameCubeController):
 
         return member in self.members
 
+    def remove_member(self, member:discord.Member):
+        self.members.discard(member)
+        self.scheduler.discard(member)
+
     async def member_perform_action(self, member:discord.Member, actions:str,
-            max_button_presses: int, min_participation: float,
-            override_pause:bool=False):
-        # If paused, do nothing!
-        if self.paused and not override_pause:
+            max_button_presses: int, override_pause:bool=False):
+        """Queue a member's button presses to be performed in fair order.
+
+        Parameters
+        ----------
+        member: discord.Member
+            The member pushing the buttons.
+        actions: str
+            A space separated list of buttons to press.
+        max_button_presses: int
+            Button press limit for the whole team, shared among its members.
+        override_pause: bool = False
+            Press the buttons immediately, ignoring the pause and the queue.
+        """
+        # If paused or closed, do nothing!
+        if self.closed or (self.paused and not override_pause):
             return
 
         # Prevent division by 0 when overriding a controller with no members.
         # Usually occurs with random input controllers
         if len(self.members) > 0:
-            # Check if at least the required percentage of the team
-            # participated
-            if len(self.members_who_pushed)/len(self.members) >=\
-                    min_participation:
-                # All have pushed, reset list
-                self.members_who_pushed = set()
             # Restrict max button presses down proportionally to the team size
             mbp = max(2, int(max_button_presses / len(self.members)))
-
-            # Check if member has already pressed a button since reset
-            if member in self.members_who_pushed:
-                return
         else:
             mbp = max_button_presses
 
@@ -68,11 +103,79 @@ class ChannelController(GameCubeController):
                 if not placed:
                     validated_actions.append([act])
 
-        # Push button
-        if len(validated_actions) > 0:
-            # Add member to pressed list
-            self.members_who_pushed.add(member)
+        if override_pause:
             for action_set in validated_actions:
                 await self.perform_actions(action_set)
-                await asyncio.sleep(1/8)
+                await asyncio.sleep(FRAME_GAP)
+            return
+
+        # Queue the pushes, the member may have at most mbp waiting.
+        # Each costs the time it occupies the device.
+        for action_set in validated_actions:
+            cost = max(act.seconds for act in action_set) + FRAME_GAP
+            if not self.scheduler.enqueue(member, action_set, cost, mbp):
+                break
+
+        if len(self.scheduler) > 0 and (self._scheduler_task is None
+                or self._scheduler_task.done()):
+            self._scheduler_task = asyncio.create_task(
+                    self._run_scheduler())
+            self._scheduler_task.add_done_callback(self._scheduler_task_done)
+
+    def _scheduler_task_done(self, task:asyncio.Task):
+        if not task.cancelled() and task.exception() is not None:
+            LOG.error(f"{self.ui.name} stopped pushing buttons: "
+                      f"{task.exception()}")
+            # Nothing will push what is left, so drop it
+            self.scheduler.clear()
+
+    async def _run_scheduler(self):
+        """Push queued buttons until every member's queue is empty.
+        Pausing drops whatever is still queued.
+        """
+        while len(self.scheduler) > 0:
+            if self.paused:
+                self.scheduler.clear()
+                return
+            member, action_set = self.scheduler.dequeue()
+            # Only wait when nothing is queued and a teammate could add to
+            # the press
+            if self.coalesce_window > 0 and len(self.members) > 1 and\
+                    len(self.scheduler) == 0:
+                await asyncio.sleep(self.coalesce_window)
+                if self.paused:
+                    self.scheduler.clear()
+                    return
+            await self.perform_actions(
+                    self._coalesce(member, list(action_set)))
+            await asyncio.sleep(FRAME_GAP)
+
+    def _coalesce(self, member:discord.Member, chord:list) -> list:
+        """Merge other members' pending inputs into a chord.
+
+        The next input of the first few members is considered in scheduler
+        order, skipping members already in the chord, so a member with
+        weight above 1 still serving their turn does not block the rest of
+        the team. Merging stops at the first input that would move an axis
+        or button the chord already uses, or that is held for a different
+        time, so conflicting inputs keep their order.
+        """
+        contributors = {member}
+        used = {(act.etype, act.code) for act in chord}
+        seconds = max(act.seconds for act in chord)
+        merged = []
+        for next_member, action_set in self.scheduler.heads(COALESCE_SCAN):
+            if next_member in contributors:
+                continue
+            codes = {(act.etype, act.code) for act in action_set}
+            if not used.isdisjoint(codes) or\
+                    max(act.seconds for act in action_set) != seconds:
+                break
+            merged.append(next_member)
+            contributors.add(next_member)
+            used |= codes
+            chord.extend(action_set)
 
+        for next_member in merged:
+            self.scheduler.take(next_member)
+        return chord
@@ -81,9 +81,24 @@ class GameCubeController():
         self.ui = evdev.uinput.UInput.from_device(
                 clone_parent,
                 name=controller_name)
+        self.closed = False
 
     def close(self):
+        if self.closed:
+            return
+        self.release_all()
         self.ui.close()
+        self.closed = True
+
+    def release_all(self) -> None:
+        """Lift every button and center every axis"""
+        if self.closed:
+            return
+        resets = {(act.etype, act.code): act.reset_value
+                  for act in ACTIONS.values()}
+        for (etype, code), reset_value in resets.items():
+            self.ui.write(etype, code, reset_value)
+        self.ui.syn()
 
     def is_open(self):
         return evdev.util.is_device(f"/dev/input/{self.ui.name}")
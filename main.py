@@ -1,3 +1,4 @@
+import asyncio
 import evdev
 import discord
 from discord.ext import tasks
@@ -19,9 +20,14 @@ from .version import __version__, Version
 
 LOG = logging.getLogger("red.controller")
 _DEFAULT_GLOBAL = {
-        "max_button_presses": 20,
-        "min_participation": 0.5
+        "max_button_presses": 20
         }
+# Most devices built at once by the bulk create commands
+_BULK_PARALLELISM = 4
+# Most controllers a single bulk create may build
+_BULK_MAX_COUNT = 16
+# Seconds shutdown may spend announcing closed controllers
+_SHUTDOWN_SECONDS = 5
 
 class Controllers(commands.Cog):
     def __init__(self, bot:Red):
@@ -43,6 +49,9 @@ class Controllers(commands.Cog):
         self._conf.register_global(**_DEFAULT_GLOBAL)
         self.controllers = {}
         self.random_controllers = {}
+        # Held while picking controller ids and adding the controllers, so
+        # concurrent creates cannot claim the same id
+        self._create_lock = asyncio.Lock()
         self.quiet = False
         self.locked = False
 
@@ -50,10 +59,120 @@ class Controllers(commands.Cog):
         await ctx.send(f"No such controller. Existing controllers are: ")
         await self.list_controllers(ctx)
 
+    async def _run_bounded(self, funcs:list) -> list:
+        """Await coroutines concurrently, at most _BULK_PARALLELISM at once
+
+        Parameters
+        ----------
+        funcs: list
+            Callables taking no arguments and returning an awaitable.
+
+        Returns
+        -------
+        list
+            The results in order, with the exception in place of any that
+            raised.
+        """
+        semaphore = asyncio.Semaphore(_BULK_PARALLELISM)
+        async def run(func):
+            async with semaphore:
+                return await func()
+        return await asyncio.gather(*(run(func) for func in funcs),
+                                    return_exceptions=True)
+
+    async def _build_controllers(self, ctx:commands.Context, controllers:dict,
+            controller_class:type, name_prefix:str, count:int,
+            clone_parent:str) -> list:
+        """Create count controllers concurrently and report them in one
+        message. Returns the newly created controllers.
+        """
+        if not 1 <= count <= _BULK_MAX_COUNT:
+            await ctx.send(f"Count must be between 1 and {_BULK_MAX_COUNT}.")
+            return []
+
+        async with self._create_lock:
+            if len(controllers) == 0:
+                first_id = 0
+            else:
+                first_id = max(controllers.keys()) + 1
+            controller_ids = list(range(first_id, first_id + count))
+
+            # Creating the evdev device blocks, so keep it off the event loop
+            loop = asyncio.get_running_loop()
+            results = await self._run_bounded([
+                lambda ctr_id=ctr_id: loop.run_in_executor(None,
+                    controller_class, ctx.channel, clone_parent,
+                    f"{name_prefix}{ctr_id}")
+                for ctr_id in controller_ids])
+
+            created = []
+            failed = []
+            for ctr_id, result in zip(controller_ids, results):
+                if isinstance(result, Exception):
+                    LOG.error(f"Failed to create {name_prefix}{ctr_id}: "
+                              f"{result}")
+                    failed.append(str(ctr_id))
+                else:
+                    controllers[ctr_id] = result
+                    created.append(f"{ctr_id} -- {result.ui.name}")
+
+        lines = []
+        if len(created) > 0:
+            lines.append(f"Created: {', '.join(created)}")
+        if len(failed) > 0:
+            lines.append(f"Failed: {', '.join(failed)}")
+        await ctx.send("\n".join(lines))
+        return [controllers[ctr_id] for ctr_id in controller_ids
+                if ctr_id in controllers]
+
+    async def _close_controllers(self, controllers:dict,
+            controller_ids:list) -> str:
+        """Close controllers without announcing each one.
+        Returns a summary of what was closed.
+        """
+        # Remove them before closing so nothing else reaches them meanwhile
+        missing = []
+        found = {}
+        for ctr_id in dict.fromkeys(controller_ids):
+            ctr = controllers.pop(ctr_id, None)
+            if ctr is None:
+                missing.append(ctr_id)
+            else:
+                found[ctr_id] = ctr
+
+        closed = []
+        for ctr_id, ctr in found.items():
+            try:
+                await ctr.close(notify=False)
+            except Exception as e:
+                LOG.error(f"Failed to close {ctr_id} cleanly: {e}")
+            closed.append(f"{ctr_id} -- {ctr.ui.name}")
+
+        summary = "Closed: " + ", ".join(closed)
+        if len(missing) > 0:
+            summary += "\nNo such controller: " + \
+                    ", ".join(str(ctr_id) for ctr_id in missing)
+        return summary
+
     @commands.Cog.listener()
     async def on_shutdown(self):
-        for ctr in self.controllers:
-            await ctr.close()
+        ctrs = list(self.controllers.values()) + \
+                list(self.random_controllers.values())
+        self.controllers = {}
+        self.random_controllers = {}
+        # Release every device first so nothing is left held down
+        for ctr in ctrs:
+            try:
+                await ctr.close(notify=False)
+            except Exception as e:
+                LOG.error(f"Failed to close {ctr.ui.name} cleanly: {e}")
+
+        try:
+            await asyncio.wait_for(
+                    self._run_bounded([ctr.closed_message for ctr in ctrs]),
+                    _SHUTDOWN_SECONDS)
+        except asyncio.TimeoutError:
+            LOG.warning("Timed out announcing closed controllers")
 
     @commands.Cog.listener()
     async def on_message(self, msg:discord.Message):
@@ -82,8 +201,7 @@ class Controllers(commands.Cog):
         for ctr in self.controllers.values():
             if ctr.channel_and_member_check(msg.channel, msg.author):
                 await ctr.member_perform_action(msg.author, msg.content.lower(),
-                        await self._conf.max_button_presses(),
-                        await self._conf.min_participation())
+                        await self._conf.max_button_presses())
 
     @commands.is_owner()
     @commands.command(aliases=['mbp'])
@@ -98,84 +216,162 @@ class Controllers(commands.Cog):
             f"max_button_press: {await self._conf.max_button_presses()}")
 
     @commands.is_owner()
-    @commands.command(aliases=['mp'])
-    async def minimum_participation(self, ctx:commands.Context, 
-            new_min: float=None):
-        """Displays or sets the minimum percentage of participation from a team.
-        Value will be cast to range of [0,1].
+    @commands.command(aliases=['mw'])
+    async def member_weight(self, ctx:commands.Context, controller_id:int,
+            member:discord.Member, new_weight:int=None):
+        """Displays or sets a member's share of their controller's inputs.
+        A member with weight 2 gets twice the button holding time of a member
+        with weight 1 while both have inputs waiting. Minimum of 1.
         """
-        if new_min is not None:
-            await self._conf.min_participation.set(
-                    min(1, max(0, new_min)))
+        ctr = self.controllers.get(controller_id)
+        if ctr is None:
+            await self.report_no_such_controller(ctx)
+            return
 
-        await ctx.send(
-            f"minimum_participation: {await self._conf.min_participation()}")
+        if new_weight is not None:
+            ctr.scheduler.set_weight(member, max(1, new_weight))
+
+        await ctx.send(f"{member.mention} weight: "
+                       f"{ctr.scheduler.get_weight(member)}")
+
+    @commands.is_owner()
+    @commands.command(aliases=['cw'])
+    async def coalesce_window(self, ctx:commands.Context, controller_id:int,
+            new_window:float=None):
+        """Displays or sets how long a controller waits, in seconds, to press
+        inputs from different members together. 0 only merges inputs that
+        are already waiting.
+        """
+        ctr = self.controllers.get(controller_id)
+        if ctr is None:
+            await self.report_no_such_controller(ctx)
+            return
+
+        if new_window is not None:
+            ctr.coalesce_window = min(1, max(0, new_window))
+
+        await ctx.send(f"coalesce_window: {ctr.coalesce_window}")
 
     @commands.is_owner()
     @commands.command(aliases=['createc'])
     async def create_controller(self, ctx:commands.Context, clone_parent:str):
-        if len(self.controllers) == 0:
-            controller_id = 0
-        else:
-            controller_id = max(self.controllers.keys()) + 1
-
-        controller_name = f"DiscordController{controller_id}"
-        self.controllers[controller_id] = ChannelController(
-                ctx.channel, clone_parent, controller_name)
+        async with self._create_lock:
+            if len(self.controllers) == 0:
+                controller_id = 0
+            else:
+                controller_id = max(self.controllers.keys()) + 1
+
+            controller_name = f"DiscordController{controller_id}"
+            self.controllers[controller_id] = ChannelController(
+                    ctx.channel, clone_parent, controller_name)
         await self.controllers[controller_id].ready_message()
 
     @commands.is_owner()
     @commands.command(aliases=['closec'])
     async def close_controller(self, ctx:commands.Context, 
             controller_id:int):
-        controller = self.controllers.get(controller_id)
+        controller = self.controllers.pop(controller_id, None)
         if controller is None:
-            await self.report_no_such_controller()
+            await self.report_no_such_controller(ctx)
             return
        
         await controller.close()
-        del self.controllers[controller_id]
+
+    @commands.is_owner()
+    @commands.command(aliases=['bulk_createc'])
+    async def create_controllers(self, ctx:commands.Context, count:int,
+            clone_parent:str):
+        """Create several member input controllers at once."""
+        await self._build_controllers(ctx, self.controllers, ChannelController,
+                                      "DiscordController", count, clone_parent)
+
+    @commands.is_owner()
+    @commands.command(aliases=['bulk_closec'])
+    async def close_controllers(self, ctx:commands.Context,
+            *controller_ids:int):
+        """Close several member input controllers at once.
+        Closes all of them if no ids are given.
+        """
+        if len(controller_ids) == 0:
+            controller_ids = list(self.controllers.keys())
+        await ctx.send(await self._close_controllers(self.controllers,
+                                                     controller_ids))
+
+    @commands.is_owner()
+    @commands.command(aliases=['bulk_resetc'])
+    async def reset_controllers(self, ctx:commands.Context,
+            *controller_ids:int):
+        """Drop queued inputs and release held buttons on several member
+        input controllers. Resets all of them if no ids are given.
+        """
+        if len(controller_ids) == 0:
+            controller_ids = list(self.controllers.keys())
+
+        reset = []
+        missing = []
+        for ctr_id in controller_ids:
+            ctr = self.controllers.get(ctr_id)
+            if ctr is None:
+                missing.append(str(ctr_id))
+                continue
+            ctr.reset()
+            reset.append(str(ctr_id))
+
+        summary = "Reset: " + ", ".join(reset)
+        if len(missing) > 0:
+            summary += f"\nNo such controller: {', '.join(missing)}"
+        await ctx.send(summary)
 
     @commands.is_owner()
     @commands.command(aliases=['createrc'])
     async def create_random_controller(self, ctx:commands.Context, 
             clone_parent:str):
-        if len(self.random_controllers) == 0:
-            controller_id = 0
-        else:
-            controller_id = max(self.random_controllers.keys()) + 1
+        async with self._create_lock:
+            if len(self.random_controllers) == 0:
+                controller_id = 0
+            else:
+                controller_id = max(self.random_controllers.keys()) + 1
+
+            controller_name = f"RandomController{controller_id}"
+            controller = RandomChannelController(
+                    ctx.channel, clone_parent, controller_name)
+            self.random_controllers[controller_id] = controller
+        await controller.ready_message()
+        controller.start_random_task()
 
-        controller_name = f"RandomController{controller_id}"
-        self.random_controllers[controller_id] = RandomChannelController(
-                ctx.channel, clone_parent, controller_name)
-        await self.random_controllers[controller_id].ready_message()
-        await self.random_controllers[controller_id].\
-                start_random_controller()
+    @commands.is_owner()
+    @commands.command(aliases=['bulk_createrc'])
+    async def create_random_controllers(self, ctx:commands.Context, count:int,
+            clone_parent:str):
+        """Create and start several random input controllers at once."""
+        created = await self._build_controllers(ctx, self.random_controllers,
+                RandomChannelController, "RandomController", count,
+                clone_parent)
+        for ctr in created:
+            ctr.start_random_task()
 
     @commands.is_owner()
     @commands.command(aliases=['closerc'])
     async def close_random_controller(self, ctx:commands.Context, 
             controller_id:int):
-        controller = self.random_controllers.get(controller_id)
+        controller = self.random_controllers.pop(controller_id, None)
         if controller is None:
             await ctx.send(f"No such controller. Existing controllers are: ")
             await self.list_controllers(ctx)
             return
       
         await controller.close()
-        del self.random_controllers[controller_id]
 
     @commands.is_owner()
     @commands.command(aliases=['close_all'])
     async def close_all_normal_and_random_controllers(self,
             ctx:commands.Context):
-        for ctr in self.controllers.values():
-            await ctr.close()
-        for ctr in self.random_controllers.values():
-            await ctr.close()
-        # Delete entire list
-        self.controllers = {}
-        self.random_controllers = {}
+        summary = await self._close_controllers(self.controllers,
+                list(self.controllers.keys()))
+        random_summary = await self._close_controllers(self.random_controllers,
+                list(self.random_controllers.keys()))
+        await ctx.send(f"Controllers {summary}\n"
+                       f"Random Controllers {random_summary}")
 
     @commands.command(aliases=['signup'])
     async def sign_up_for_controller(self, ctx:commands.Context, 
@@ -220,7 +416,7 @@ class Controllers(commands.Cog):
 
         for ctr in self.controllers.values():
             if ctx.author in ctr.members:
-                ctr.members.remove(ctx.author)
+                ctr.remove_member(ctx.author)
                 await ctx.send(f"Unsigned up {ctx.author.mention} from "
                                f"{controller_id}")
                 return
@@ -348,7 +544,7 @@ class Controllers(commands.Cog):
     async def push_button_for_controller(self, ctx:commands.Context, 
             controller_id:int, buttons:str):
         """Manually push a button for a member input controller.
-        As this is an admin command it overrides the participation rules and
+        As this is an admin command it skips the input queue and
         lifts the button pressing limit to 100 no matter the actual value.
         controller_id: int
             The controller id.
@@ -359,7 +555,6 @@ class Controllers(commands.Cog):
             await self.controllers[controller_id].\
                     member_perform_action(ctx.author, buttons.lower(),
                                           100, # No need to constrain ourselves
-                                          0, # No need to block our selves
                                           True) # Override the pause
         else:
             await self.report_no_such_controller(ctx)
@@ -369,7 +564,7 @@ class Controllers(commands.Cog):
     async def push_button_for_random_controller(self, ctx:commands.Context, 
             controller_id:int, buttons:str):
         """Manually push a button for a random input controller.
-        As this is an admin command it overrides the participation rules and
+        As this is an admin command it skips the input queue and
         lifts the button pressing limit to 100 no matter the actual value.
         controller_id: int
             The controller id.
@@ -380,7 +575,6 @@ class Controllers(commands.Cog):
             await self.random_controllers[controller_id].\
                     member_perform_action(ctx.author, buttons.lower(),
                                           100, # No need to constrain ourselves
-                                          0, # No need to block our selves
                                           True) # Override the pause
         else:
             await self.report_no_such_controller(ctx)
@@ -1,22 +1,39 @@
 import asyncio
 import discord
+import logging
 import random
 random.seed()
 
 from .controller import ACTIONS, SUGGESTED_BANNED_INPUTS
 from .channel_controller import ChannelController
 
+LOG = logging.getLogger("red.controller")
+
 class RandomChannelController(ChannelController):
     def __init__(self, channel:discord.TextChannel, clone_parent:str,
                  controller_name:str):
         super().__init__(channel, clone_parent, controller_name)
         self.__keep_going = True
+        self._random_task = None
 
-    async def close(self):
-        await super().close()
+    async def close(self, notify:bool=True):
+        # Stop pressing before the device is released and closed
+        if self._random_task is not None:
+            self._random_task.cancel()
+        await super().close(notify)
         # Ensures that the infinite while loop ends
         self.__keep_going = False
 
+    def start_random_task(self, banned_inputs=None):
+        """Run the random controller in the background until closed"""
+        self._random_task = asyncio.create_task(
+                self.start_random_controller(banned_inputs))
+        self._random_task.add_done_callback(self._random_task_done)
+
+    def _random_task_done(self, task:asyncio.Task):
+        if not task.cancelled() and task.exception() is not None:
+            LOG.error(f"{self.ui.name} stopped: {task.exception()}")
+
     async def start_random_controller(self, banned_inputs=None):
         if banned_inputs is None:
             banned_inputs = SUGGESTED_BANNED_INPUTS
@@ -0,0 +1,172 @@
+"""Deficit round-robin scheduling of member inputs"""
+
+from collections import deque
+import itertools
+from typing import Any, Hashable, Iterator, Tuple
+
+
+class DeficitRoundRobin():
+    def __init__(self, quantum:float, default_weight:int=1):
+        """Fair scheduler holding a small queue per key.
+
+        Keys with pending items take turns at the head of an active ring.
+        Each item carries a cost, and each turn a key is credited
+        weight x quantum and serves items while its credit covers their
+        cost, so the total cost served is shared in proportion to the
+        weights. Enqueue, dequeue and take are all amortised O(1).
+
+        Parameters
+        ----------
+        quantum: float
+            Credit per turn for a key of weight 1. Must be at least the
+            largest item cost, so every turn serves at least one item.
+        default_weight: int
+            The weight used for keys without an explicit weight.
+        """
+        self.quantum = quantum
+        self.default_weight = default_weight
+        self.weights = {}
+        self._queues = {}
+        self._deficits = {}
+        # Keys in turn order. A key whose queue was emptied out of turn
+        # stays here until it reaches the head, rather than paying to be
+        # removed from the middle.
+        self._active = deque()
+        self._pending = 0
+        # Whether the key at the head has been credited for its turn
+        self._head_credited = False
+
+    def __len__(self) -> int:
+        """Number of keys with pending items"""
+        return self._pending
+
+    def get_weight(self, key:Hashable) -> int:
+        return self.weights.get(key, self.default_weight)
+
+    def set_weight(self, key:Hashable, weight:int) -> None:
+        """Set the share of throughput given to a key.
+
+        Parameters
+        ----------
+        key: Hashable
+            The key to set the weight of.
+        weight: int
+            Multiple of the quantum credited to the key per turn, at least 1.
+        """
+        if weight < 1:
+            raise ValueError("weight must be at least 1")
+        self.weights[key] = weight
+
+    def enqueue(self, key:Hashable, item:Any, cost:float,
+            max_pending:int) -> bool:
+        """Add an item to the end of a key's queue.
+
+        Parameters
+        ----------
+        key: Hashable
+            The key the item belongs to.
+        item: Any
+            The item to queue.
+        cost: float
+            How much of the key's credit serving the item uses.
+        max_pending: int
+            The most items the key may have waiting.
+
+        Returns
+        -------
+        bool
+            False if the key's queue was full and the item was dropped.
+        """
+        if cost > self.quantum:
+            raise ValueError("cost must not exceed the quantum")
+        queue = self._queues.get(key)
+        if len(queue or ()) >= max_pending:
+            return False
+        if queue is None:
+            queue = self._queues[key] = deque()
+            self._deficits[key] = 0
+            self._active.append(key)
+        if len(queue) == 0:
+            self._pending += 1
+        queue.append((cost, item))
+        return True
+
+    def dequeue(self) -> Tuple[Hashable, Any]:
+        """Remove and return the next key and item in fair order"""
+        if self._pending == 0:
+            raise IndexError("dequeue from an empty scheduler")
+        self._drop_idle_head()
+        key = self._active[0]
+        queue = self._queues[key]
+        if not self._head_credited:
+            self._deficits[key] += self.get_weight(key) * self.quantum
+            self._head_credited = True
+        cost, item = queue.popleft()
+        self._deficits[key] -= cost
+
+        if len(queue) == 0:
+            # Idle keys do not bank credit
+            self._pending -= 1
+            self._drop_idle_head()
+        elif self._deficits[key] < queue[0][0]:
+            # Out of credit, keep the remainder for the next turn
+            self._active.rotate(-1)
+            self._head_credited = False
+        return key, item
+
+    def heads(self, limit:int) -> Iterator[Tuple[Hashable, Any]]:
+        """Each key with pending items and its next item, in turn order.
+
+        Parameters
+        ----------
+        limit: int
+            The most keys to look at, including idle ones.
+        """
+        for key in itertools.islice(self._active, limit):
+            queue = self._queues[key]
+            if len(queue) > 0:
+                yield key, queue[0][1]
+
+    def take(self, key:Hashable) -> Any:
+        """Remove and return a key's next item out of turn.
+
+        The item's cost is still charged to the key, which may leave it in
+        debt for its next turn.
+        """
+        queue = self._queues[key]
+        cost, item = queue.popleft()
+        self._deficits[key] -= cost
+        if len(queue) == 0:
+            self._make_idle(key)
+        return item
+
+    def discard(self, key:Hashable) -> None:
+        """Drop every pending item of a key"""
+        queue = self._queues.get(key)
+        if queue is not None and len(queue) > 0:
+            queue.clear()
+            self._make_idle(key)
+
+    def clear(self) -> None:
+        """Drop every pending item"""
+        self._queues.clear()
+        self._deficits.clear()
+        self._active.clear()
+        self._pending = 0
+        self._head_credited = False
+
+    def _make_idle(self, key:Hashable) -> None:
+        """Account for a key emptied out of turn, leaving it in the ring"""
+        self._pending -= 1
+        self._deficits[key] = 0
+        if self._active[0] == key:
+            self._head_credited = False
+
+    def _drop_idle_head(self) -> None:
+        """Remove idle keys from the front of the ring"""
+        while len(self._active) > 0 and \
+                len(self._queues[self._active[0]]) == 0:
+            key = self._active.popleft()
+            del self._queues[key]
+            del self._deficits[key]
+            self._head_credited = False